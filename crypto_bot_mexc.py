@@ -2,18 +2,27 @@
 crypto_bot_mexc.py  (fix WS URL & subscription)
 • Usa WebSocket oficial V3 `wss://wbs.mexc.com/ws`.
 • Canal de K‑line conforme docs: `spot@public.kline.v3.api.pb@SYMBOL@Min1`.
+• Vários símbolos (SYMBOLS=BTCUSDT,ETHUSDT) num único WebSocket e num único
+  cliente HTTP; cada símbolo roda seu próprio `manage_loop` num TaskGroup.
 """
 
-import os, asyncio, json, hmac, hashlib, time, logging
+import os, sys, asyncio, time, logging
 from datetime import datetime, timezone
 from urllib.parse import urlencode
 
 import httpx
+from cryptography.hazmat.primitives import hashes, hmac as chmac
+import numpy as np
 import pandas as pd
-from ta.volatility import average_true_range
-from ta.trend import ema_indicator
-from ta.momentum import rsi
+from numba import njit
+import orjson
+from pyrate_limiter import Duration, Limiter, Rate
+import talib
+import uvloop
 import websockets
+
+# os *_pb2 gerados pelo protoc importam uns aos outros como módulos de topo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mexc_pb"))
 from mexc_pb import PushDataV3ApiWrapper_pb2
 
 logging.basicConfig(level=logging.INFO,
@@ -24,7 +33,7 @@ API_SECRET = os.getenv("MEXC_API_SECRET")
 if not API_KEY or not API_SECRET:
     raise RuntimeError("MEXC_API_KEY e MEXC_API_SECRET são obrigatórias.")
 
-SYMBOL       = os.getenv("SYMBOL", "BTCUSDT").upper()
+SYMBOLS      = [s.strip().upper() for s in os.getenv("SYMBOLS", os.getenv("SYMBOL", "BTCUSDT")).split(",") if s.strip()]
 INTERVAL     = os.getenv("INTERVAL", "1m").lower()  # ex: 1m, 5m
 RISK_PCT     = float(os.getenv("RISK_PCT", "0.01"))
 ATR_WINDOW   = int(os.getenv("ATR_WINDOW", "14"))
@@ -32,9 +41,19 @@ MA_WINDOW    = int(os.getenv("MA_WINDOW", "20"))
 HYSTERESIS_K = float(os.getenv("HYSTERESIS_K", "0.2"))
 MIN_BARS_POS = int(os.getenv("MIN_BARS_IN_POSITION", "3"))
 MIN_VOL_PCT  = float(os.getenv("MIN_VOL_PCT", "0.0003"))
+REST_RATE    = int(os.getenv("REST_RATE", "10"))  # req/s p/ a API REST
+BALANCE_TTL  = float(os.getenv("BALANCE_TTL", "60"))  # s até reler saldos via REST
+QUOTE        = "USDT"
 BASE_URL     = "https://api.mexc.com"
 WS_URL       = "wss://wbs.mexc.com/ws"  # <- fix principal
 
+# HMAC já chaveado (ipad/opad calculados uma vez); cada assinatura faz .copy()
+API_SECRET_B   = API_SECRET.encode()
+_HMAC_TEMPLATE = chmac.HMAC(API_SECRET_B, hashes.SHA256())  # OpenSSL direto, sem wrapper Python
+
+# token bucket local: espera em vez de estourar o limite da MEXC (429)
+_LIMITER = Limiter(Rate(REST_RATE, Duration.SECOND))
+
 # -------- util ----------
 INTERVAL_MAP = {
     "1m": "Min1", "5m": "Min5", "15m": "Min15", "30m": "Min30",
@@ -43,113 +62,293 @@ INTERVAL_MAP = {
 }
 interval_pb = INTERVAL_MAP.get(INTERVAL, "Min1")
 
-async def mexc_request(method: str, path: str, params: dict | None = None):
-    params = params or {}
-    params["timestamp"] = int(time.time()*1000)
-    query = urlencode(sorted(params.items()))
-    sign  = hmac.new(API_SECRET.encode(), query.encode(), hashlib.sha256).hexdigest()
-    query += f"&signature={sign}"
-    url = f"{BASE_URL}{path}?{query}"
-    headers = {"X-MEXC-APIKEY": API_KEY}
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.request(method, url, headers=headers)
+def kline_channel(symbol: str) -> str:
+    return f"spot@public.kline.v3.api.pb@{symbol}@{interval_pb}"
+
+# pré-computadas uma vez: URLs REST
+ACCOUNT_URL = httpx.URL("/api/v3/account")
+ORDER_URL   = httpx.URL("/api/v3/order")
+
+SIG_CODE = {None: 0, "BUY": 1, "SELL": -1}
+SIG_NAME = {v: k for k, v in SIG_CODE.items()}
+
+@njit(cache=True)
+def decide(close, atr, ma, ema_fast, ema_slow, last_signal, min_vol_pct, k):
+    """Histerese sobre a MA + filtro de EMAs; retorna 1 (BUY), -1 (SELL) ou 0."""
+    if atr != atr or atr == 0 or atr / close < min_vol_pct:
+        return 0
+    margem = k * atr
+    if close < ma - margem:
+        sig = 1
+    elif close > ma + margem:
+        sig = -1
+    else:
+        sig = last_signal
+    if sig == 1 and ema_fast <= ema_slow:
+        return 0
+    if sig == -1 and ema_fast >= ema_slow:
+        return 0
+    return sig
+
+BUF_LEN = 200  # barras mantidas em memória
+COLS    = ("open", "high", "low", "close", "volume")
+EMA_FAST, EMA_SLOW = 12, 26
+A_FAST, A_SLOW     = 2 / (EMA_FAST + 1), 2 / (EMA_SLOW + 1)
+WARMUP  = max(MA_WINDOW, EMA_SLOW, ATR_WINDOW + 1)  # barras fechadas p/ semear o estado
+
+class MexcClient:
+    """REST assinado; uma instância compartilhada por todos os símbolos."""
+    def __init__(self):
+        # cliente único: mantém conexões keep-alive (HTTP/2) abertas com a API
+        self.http = httpx.AsyncClient(
+            base_url=BASE_URL, http2=True, timeout=10,
+            headers={"X-MEXC-APIKEY": API_KEY},
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16,
+                                keepalive_expiry=300),
+        )
+        # saldos livres por ativo; ajustados localmente a cada ordem
+        self._balances: dict[str, float] | None = None
+        self._balances_at = 0.0
+        self._balances_lock = asyncio.Lock()  # um refresh em voo, compartilhado
+        self._orders_gen = 0      # incrementa a cada ordem concluída (ok ou erro)
+        self._orders_pending = 0  # ordens com POST em andamento
+
+    async def __aenter__(self):
+        await self.http.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.http.__aexit__(*exc)
+
+    async def warmup(self, n: int = 4):
+        """Abre conexões com /api/v3/ping para a 1ª ordem não pagar o handshake TLS."""
+        res = await asyncio.gather(*(self.http.get("/api/v3/ping") for _ in range(n)),
+                                   return_exceptions=True)
+        if errs := [r for r in res if isinstance(r, Exception)]:
+            logging.warning(f"warmup: {len(errs)}/{n} pings falharam ({errs[0]})")
+
+    async def _signed(self, method: str, url: httpx.URL, params: dict | None = None):
+        await _LIMITER.try_acquire_async("mexc")
+        params = params or {}
+        params["timestamp"] = int(time.time()*1000)
+        query = urlencode(sorted(params.items())).encode()
+        h = _HMAC_TEMPLATE.copy()
+        h.update(query)
+        # query pronta em bytes: o httpx a usa como está, sem re-encode
+        url = url.copy_with(query=query + b"&signature=" + h.finalize().hex().encode())
+        r = await self.http.request(method, url)
         r.raise_for_status()
         return r.json()
 
+    async def refresh_balances(self):
+        gen = self._orders_gen
+        data = await self._signed("GET", ACCOUNT_URL)
+        balances = {b["asset"]: float(b["free"]) for b in data["balances"]}
+        if gen != self._orders_gen or self._orders_pending:
+            # ordem concorrente: o snapshot pode ser anterior a ela e desfazer o ajuste local
+            if self._balances is None:
+                self._balances, self._balances_at = balances, 0.0  # usa, mas já vencido
+            return
+        self._balances, self._balances_at = balances, time.monotonic()
+
+    async def get_balance(self, asset: str = QUOTE) -> float:
+        """Saldo livre do cache; REST só se expirou (BALANCE_TTL) ou após erro."""
+        async with self._balances_lock:
+            # quem esperou o lock reaproveita o refresh de quem chegou antes
+            if self._balances is None or time.monotonic() - self._balances_at > BALANCE_TTL:
+                await self.refresh_balances()
+        return self._balances.get(asset, 0.0)
+
+    async def create_order(self, symbol: str, side: str, qty: float, price: float):
+        self._orders_pending += 1
+        try:
+            await self._signed("POST", ORDER_URL, {
+                "symbol": symbol, "side": side, "type": "MARKET", "quantity": qty
+            })
+        except Exception:
+            self._balances = None  # estado incerto: relê na próxima consulta
+            raise
+        finally:
+            self._orders_pending -= 1
+            self._orders_gen += 1
+        logging.info(f"ORDEM {symbol} {side} {qty:.6f} enviada")
+        if self._balances is None:
+            return
+        if not symbol.endswith(QUOTE):
+            self._balances = None
+            return
+        # estimativa a `price` até o próximo refresh trazer o valor executado
+        d = qty if side == "BUY" else -qty
+        base = symbol[:-len(QUOTE)]
+        self._balances[base] = self._balances.get(base, 0.0) + d
+        self._balances[QUOTE] = self._balances.get(QUOTE, 0.0) - d * price
+
 class CryptoBotMEXC:
-    def __init__(self):
-        self.df = pd.DataFrame()
+    def __init__(self, symbol: str, api: MexcClient):
+        self.symbol  = symbol
+        self.channel = kline_channel(symbol)
+        self.api     = api
+        self.queue: asyncio.Queue = asyncio.Queue()  # klines vindos do dispatcher
+        # ring buffer (SoA): uma coluna numpy por campo, indexada por self.head
+        self.buf  = {c: np.empty(BUF_LEN) for c in COLS}
+        self.ts   = np.empty(BUF_LEN, dtype="i8")  # windowStart cru (epoch s)
+        self.head = 0  # próxima posição livre
+        self.n    = 0  # barras válidas no buffer
+        self._raw = None  # strings do último push (high, low, close, volume)
+        self.atr = self.ma20 = self.ema_fast = self.ema_slow = None
+        # estado incremental sobre barras fechadas (semeado via TA-Lib em _seed)
+        self._seeded = False
+        self._ema_fast = self._ema_slow = self._atr = self._sum = 0.0
         self.position = None
         self.last_signal = None
 
-    # balance, order (mesmos de antes) ...
-    async def get_balance(self, asset: str = "USDT") -> float:
-        data = await mexc_request("GET", "/api/v3/account")
-        bal = next((b for b in data["balances"] if b["asset"] == asset), None)
-        return float(bal["free"] if bal else 0)
-
-    async def create_order(self, side: str, qty: float):
-        await mexc_request("POST", "/api/v3/order", {
-            "symbol": SYMBOL, "side": side, "type": "MARKET", "quantity": qty
-        })
-        logging.info(f"ORDEM {side} {qty:.6f} enviada")
-
-    # update_df, compute_indicators, signal, manage (inalterados)
-    def update_df(self, k):
-        ts = pd.to_datetime(int(k["windowstart"])*1000, unit="ms")
-        self.df.loc[ts, ["open", "high", "low", "close", "volume"]] = [
-            float(k["openingprice"]), float(k["highestprice"]), float(k["lowestprice"]),
-            float(k["closingprice"]), float(k["volume"])
-        ]
-        if len(self.df) > 200:
-            self.df = self.df.tail(200)
+    # ring buffer, indicadores incrementais, sinal e gestão da posição
+    def update_df(self, k) -> bool:
+        """`k` é um PublicSpotKlineV3Api já decodificado (preços chegam como string).
+        Retorna False se o push repete a vela corrente sem mudança ou é de vela anterior."""
+        ts = k.windowStart
+        raw = (k.highestPrice, k.lowestPrice, k.closingPrice, k.volume)
+        last = (self.head - 1) % BUF_LEN
+        if self.n and ts < self.ts[last]:
+            return False  # push atrasado de vela já superada: o buffer só cresce no fim
+        newer = not self.n or ts > self.ts[last]
+        # mesma vela: compara as strings antes de gastar float() com elas
+        if not newer and raw == self._raw:
+            return False
+        # converte tudo antes de mexer no buffer: push inválido não deixa vela pela metade
+        vals = [float(v) for v in raw]
+        if not newer:
+            i = last
+        else:
+            opening = float(k.openingPrice)  # fixo durante a vela
+            if self.n:
+                # só uma janela estritamente mais nova fecha a vela `last`
+                self._roll(last)
+            i = self.head
+            self.head = (self.head + 1) % BUF_LEN
+            self.n = min(self.n + 1, BUF_LEN)
+            self.ts[i] = ts
+            self.buf["open"][i] = opening
+        self._raw = raw
+        for c, v in zip(COLS[1:], vals):
+            self.buf[c][i] = v
+        return True
+
+    def _order(self, n: int | None = None) -> np.ndarray:
+        n = self.n if n is None else min(n, self.n)
+        return (self.head - n + np.arange(n)) % BUF_LEN
+
+    def window(self, col: str, n: int | None = None) -> np.ndarray:
+        """Últimas `n` barras de `col` em ordem cronológica (cópia)."""
+        return self.buf[col][self._order(n)]
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """Visão pandas do buffer, montada sob demanda (debug/métricas/REPL)."""
+        order = self._order()
+        return pd.DataFrame({c: self.buf[c][order] for c in COLS},
+                            index=pd.DatetimeIndex(self.ts[order].astype("datetime64[s]")))
+
+    def _seed(self):
+        high, low, close = (self.window(c) for c in ("high", "low", "close"))
+        self._ema_fast = talib.EMA(close, EMA_FAST)[-1]
+        self._ema_slow = talib.EMA(close, EMA_SLOW)[-1]
+        self._atr = talib.ATR(high, low, close, timeperiod=ATR_WINDOW)[-1]
+        self._sum = close[-(MA_WINDOW - 1):].sum() if MA_WINDOW > 1 else 0.0
+        self._seeded = True
+
+    def _roll(self, j: int):
+        """Incorpora a barra fechada `j` ao estado (EMA, soma da SMA, ATR de Wilder)."""
+        if not self._seeded:
+            if self.n >= WARMUP:
+                self._seed()
+            return
+        c = self.buf["close"]
+        close, prev = c[j], c[(j - 1) % BUF_LEN]
+        tr = max(self.buf["high"][j], prev) - min(self.buf["low"][j], prev)
+        self._ema_fast += A_FAST * (close - self._ema_fast)
+        self._ema_slow += A_SLOW * (close - self._ema_slow)
+        self._atr = (self._atr * (ATR_WINDOW - 1) + tr) / ATR_WINDOW
+        if MA_WINDOW > 1:
+            self._sum += close - c[(j - MA_WINDOW + 1) % BUF_LEN]
 
     def compute_indicators(self):
-        if len(self.df) < MA_WINDOW:
+        # barra corrente ainda aberta: valores provisórios sobre o estado fechado, O(1)
+        if not self._seeded:
             return
-        last = self.df.iloc[-MA_WINDOW:]
-        idx = self.df.index[-1]
-        self.df.at[idx, "atr"] = average_true_range(last["high"], last["low"], last["close"], ATR_WINDOW).iloc[-1]
-        self.df.at[idx, "ma20"] = last["close"].rolling(MA_WINDOW).mean().iloc[-1]
-        self.df.at[idx, "ema_fast"] = ema_indicator(last["close"], 12).iloc[-1]
-        self.df.at[idx, "ema_slow"] = ema_indicator(last["close"], 26).iloc[-1]
+        i = (self.head - 1) % BUF_LEN
+        close, prev = self.buf["close"][i], self.buf["close"][(i - 1) % BUF_LEN]
+        tr = max(self.buf["high"][i], prev) - min(self.buf["low"][i], prev)
+        self.atr = (self._atr * (ATR_WINDOW - 1) + tr) / ATR_WINDOW
+        self.ma20 = (self._sum + close) / MA_WINDOW
+        self.ema_fast = self._ema_fast + A_FAST * (close - self._ema_fast)
+        self.ema_slow = self._ema_slow + A_SLOW * (close - self._ema_slow)
 
     def signal(self):
-        if len(self.df) < MA_WINDOW:
-            return None
-        row = self.df.iloc[-1]
-        atr, ma, close = row["atr"], row["ma20"], row["close"]
-        if pd.isna(atr) or atr == 0 or atr/close < MIN_VOL_PCT:
+        if self.n < MA_WINDOW or self.atr is None:
             return None
-        margem = HYSTERESIS_K * atr
-        if close < ma - margem:
-            sig = "BUY"
-        elif close > ma + margem:
-            sig = "SELL"
-        else:
-            sig = self.last_signal
-        if sig == "BUY" and row["ema_fast"] <= row["ema_slow"]:
-            return None
-        if sig == "SELL" and row["ema_fast"] >= row["ema_slow"]:
-            return None
-        return sig
+        close = self.buf["close"][(self.head - 1) % BUF_LEN]
+        return SIG_NAME[decide(close, self.atr, self.ma20, self.ema_fast, self.ema_slow,
+                               SIG_CODE[self.last_signal], MIN_VOL_PCT, HYSTERESIS_K)]
 
     async def manage(self):
         ...  # mantém igual (omitido aqui por brevidade)
 
-    async def run(self):
-        channel = f"spot@public.kline.v3.api.pb@{SYMBOL}@{interval_pb}"
-        sub_msg = {"method": "SUBSCRIPTION", "params": [channel], "id": 1}
+    async def manage_loop(self):
         while True:
+            k = await self.queue.get()
             try:
-                async with websockets.connect(WS_URL, ping_interval=20) as ws:
-                    await ws.send(json.dumps(sub_msg))
-                    async for raw in ws:
-                        if isinstance(raw, bytes):
-                            wrapper = PushDataV3ApiWrapper_pb2.PushDataV3ApiWrapper()
-                            wrapper.ParseFromString(raw)
-                            if wrapper.channel != channel or wrapper.WhichOneof("body") != "publicSpotKline":
-                                continue
-                            k = wrapper.publicSpotKline
-                            kline = {
-                                "interval": k.interval,
-                                "windowstart": k.windowStart,
-                                "openingprice": k.openingPrice,
-                                "closingprice": k.closingPrice,
-                                "highestprice": k.highestPrice,
-                                "lowestprice": k.lowestPrice,
-                                "volume": k.volume,
-                                "windowend": k.windowEnd,
-                            }
-                            self.update_df(kline)
-                            self.compute_indicators()
-                            await self.manage()
+                # drena o que já chegou; indicadores/manage uma vez por rajada
+                fresh = self.update_df(k)
+                while not self.queue.empty():
+                    fresh |= self.update_df(self.queue.get_nowait())
+                if not fresh:
+                    continue
+                self.compute_indicators()
+                await self.manage()
             except Exception as e:
-                logging.error(f"WS erro: {e} — reconecta em 5 s")
-                await asyncio.sleep(5)
+                # kline inválido ou erro de REST não derruba os outros símbolos do TaskGroup
+                logging.error(f"{self.symbol} erro: {e}")
+
+async def connect_and_dispatch(bots: list[CryptoBotMEXC]):
+    """Um WebSocket com os canais de todos os símbolos; repassa cada kline à fila do bot."""
+    routes = {b.channel: b.queue for b in bots}
+    # montado uma vez por chamada a partir das rotas (frame texto), não a cada reconexão
+    sub_msg = orjson.dumps({"method": "SUBSCRIPTION", "params": list(routes), "id": 1}).decode()
+    # permessage-deflate só compensa p/ JSON; protobuf já é compacto
+    compression = None if all(".pb@" in c for c in routes) else "deflate"
+    while True:
+        try:
+            async with websockets.connect(WS_URL, ping_interval=20, compression=compression) as ws:
+                await ws.send(sub_msg)
+                async for raw in ws:
+                    if not isinstance(raw, bytes):
+                        # frames texto: ack de SUBSCRIPTION / erros do servidor
+                        logging.info(f"WS: {raw}")
+                        continue
+                    # wrapper novo por frame: o kline segue vivo na fila do bot
+                    wrapper = PushDataV3ApiWrapper_pb2.PushDataV3ApiWrapper()
+                    wrapper.ParseFromString(raw)
+                    queue = routes.get(wrapper.channel)
+                    if queue is None or wrapper.WhichOneof("body") != "publicSpotKline":
+                        continue
+                    queue.put_nowait(wrapper.publicSpotKline)
+        except Exception as e:
+            logging.error(f"WS erro: {e} — reconecta em 5 s")
+            await asyncio.sleep(5)
 
 async def main():
-    await CryptoBotMEXC().run()
+    async with MexcClient() as api:
+        await api.warmup()
+        try:
+            await api.refresh_balances()
+        except Exception as e:
+            logging.warning(f"saldo inicial indisponível: {e}")
+        bots = [CryptoBotMEXC(s, api) for s in SYMBOLS]
+        async with asyncio.TaskGroup() as tg:
+            for bot in bots:
+                tg.create_task(bot.manage_loop())
+            tg.create_task(connect_and_dispatch(bots))
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    uvloop.run(main())
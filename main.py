@@ -1,6 +1,6 @@
 # main.py
-import asyncio
-from crypto_bot import main as run_bot   # importa a função main() definida no arquivo novo
+import uvloop
+from crypto_bot_mexc import main as run_bot   # importa a função main() do bot
 
 if __name__ == "__main__":
-    asyncio.run(run_bot())
+    uvloop.run(run_bot())